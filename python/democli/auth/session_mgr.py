@@ -1,6 +1,6 @@
 import requests
 from democli.utils.log_util import create_logger
-from democli.utils.http_util import check_status
+from democli.utils.http_util import check_status, xmlns
 from democli.utils.common_util import encode_for_display
 from democli.version import VERSION
 import xml.etree.ElementTree as ET  # Contains methods used to build and parse XML
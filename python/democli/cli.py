@@ -1,6 +1,7 @@
 import os
 import sys
 import click
+from democli.utils.profile_util import Profiler
 
 # Providing ability to pass the value of command line option via environment variable
 # Example - environment variable should be set as export DEMO_API_VERBOSE='true'
@@ -14,6 +15,7 @@ class Context(object):
     def __init__(self):
         self.verbose = False
         self.home = os.getcwd()
+        self.profiler = None
 
     def log(self, msg, *args):
         """Logs a message to stderr."""
@@ -26,6 +28,11 @@ class Context(object):
         if self.verbose:
             self.log(msg, *args)
 
+    def phase(self, name):
+        """Starts a new profiling phase if profiling is enabled."""
+        if self.profiler is not None:
+            self.profiler.phase(name)
+
 
 pass_context = click.make_pass_decorator(Context, ensure=True)
 cmd_folder = os.path.abspath(
@@ -65,10 +72,20 @@ class DemoCLI(click.MultiCommand):
     '-v', '--verbose',
     is_flag=True, help='Enables verbose mode.'
 )
+@click.option(
+    '--profile',
+    type=click.Path(dir_okay=False, writable=True, resolve_path=True),
+    help='Profiles memory and cpu usage of the command and writes the report to this file.'
+)
 @pass_context
-def cli(ctx, verbose, home):
+def cli(ctx, verbose, home, profile):
     """Demo command line interface."""
     ctx.verbose = verbose
     if home is not None:
         ctx.home = home
+    if profile is not None:
+        ctx.profiler = Profiler(profile)
+        ctx.profiler.start()
+        # Runs once the sub command has finished, including on error
+        click.get_current_context().call_on_close(ctx.profiler.stop)
 
@@ -0,0 +1,154 @@
+import click
+from democli.cli import pass_context
+from democli.utils.click_util import common_options
+from democli.utils.log_util import create_logger
+from democli.utils.common_util import quit_on_error
+from democli.auth.session_mgr import SessionMgr
+from democli.workbook.workbook_mgr import WorkbookMgr
+from democli.job.job_mgr import JobMgr, MAX_CONCURRENT, MIN_POLL_INTERVAL, MAX_POLL_INTERVAL
+
+logger = create_logger(__name__)
+
+# common options for sub commands
+_common_options = [
+    click.option(
+        '-s', '--server', required=True, help='The specified server address'
+    ),
+    click.option(
+        '-u', '--username', required=True, help='The username(not ID) of the user to sign in as'
+    ),
+    click.option(
+        '-p', '--password', required=True, help='The password of the user to sign in as'
+    ),
+    click.option(
+        '--max_concurrent', default=MAX_CONCURRENT, show_default=True, type=click.IntRange(min=1),
+        help='The maximum number of jobs running at once'
+    ),
+    click.option(
+        '--poll_interval', default=MIN_POLL_INTERVAL, show_default=True, type=float,
+        help='The initial seconds between job polls, greater than 0'
+    ),
+    click.option(
+        '--max_poll_interval', default=MAX_POLL_INTERVAL, show_default=True, type=float,
+        help='The maximum seconds between job polls, at least the initial interval'
+    ),
+    click.option(
+        '--timeout', type=click.FloatRange(min=0),
+        help='The seconds after which unfinished jobs are reported as unknown, waits for all jobs if not set'
+    )
+]
+
+
+def _check_intervals(poll_interval, max_poll_interval):
+    """Reports a usage error for poll intervals which would poll without sleeping"""
+    if poll_interval <= 0:
+        raise click.BadParameter('must be greater than 0', param_hint="'--poll_interval'")
+    if max_poll_interval < poll_interval:
+        raise click.BadParameter('must not be smaller than --poll_interval', param_hint="'--max_poll_interval'")
+
+
+@click.group('job', short_help='Root command to manage asynchronous jobs')
+@pass_context
+def cli(ctx):
+    """Root command to manage asynchronous jobs"""
+    pass
+
+
+@cli.command('refresh', short_help='Refresh extracts of workbooks and datasources')
+@common_options(_common_options)
+@click.option(
+    '-w', '--workbook_name', multiple=True, help='The name of workbook to refresh, can be repeated'
+)
+@click.option(
+    '-d', '--datasource_name', multiple=True, help='The name of datasource to refresh, can be repeated'
+)
+@pass_context
+def refresh(ctx, server, username, password, max_concurrent, poll_interval, max_poll_interval, timeout,
+            workbook_name, datasource_name):
+    """Refresh extracts of workbooks and datasources"""
+    _check_intervals(poll_interval, max_poll_interval)
+
+    logger.info("\n*Refreshing {0} workbook(s) and {1} datasource(s) as {2}*".format(
+        len(workbook_name), len(datasource_name), username))
+
+    ##### STEP 1: Sign in #####
+    ctx.phase("1. Sign in")
+    logger.info("\n1. Signing in as " + username)
+    session_mgr = SessionMgr(ctx, server, username, password)
+    auth_token, site_id, user_id = session_mgr.sign_in()
+
+    try:
+        ##### STEP 2: Find workbook and datasource ids #####
+        ctx.phase("2. Find workbook and datasource ids")
+        logger.info("\n2. Finding workbook and datasource ids")
+        job_mgr = JobMgr(ctx, server, auth_token, site_id, max_concurrent, poll_interval, max_poll_interval, timeout)
+        tasks = []
+        for resource, names in (('workbook', workbook_name), ('datasource', datasource_name)):
+            if names:
+                for name, item_id in job_mgr.get_ids(resource, names).items():
+                    tasks.append(("{0} '{1}'".format(resource, name),
+                                  lambda resource=resource, item_id=item_id: job_mgr.refresh(resource, item_id)))
+
+        ##### STEP 3: Queue refreshes and wait for completion #####
+        ctx.phase("3. Queue refreshes and wait for completion")
+        logger.info("\n3. Queuing {0} refresh job(s), at most {1} at a time".format(len(tasks), max_concurrent))
+        results = job_mgr.run(tasks)
+    finally:
+        ##### STEP 4: Sign out #####
+        ctx.phase("4. Sign out")
+        logger.info("\n4. Signing out and invalidating the authentication token")
+        session_mgr.sign_out(auth_token)
+
+    failed = [label for label, status in results.items() if status != 'Success']
+    if failed:
+        quit_on_error("Refresh did not succeed for: {0}".format(', '.join(failed)))
+
+
+@cli.command('publish', short_help='Publish workbooks asynchronously')
+@common_options(_common_options)
+@click.option(
+    '-f', '--workbook_file', required=True, multiple=True, type=click.Path(exists=True, dir_okay=False),
+    help='The workbook file to publish, can be repeated'
+)
+@click.option(
+    '-d', '--dest_project', required=True, help='The destination project'
+)
+@pass_context
+def publish(ctx, server, username, password, max_concurrent, poll_interval, max_poll_interval, timeout,
+            workbook_file, dest_project):
+    """Publish workbooks asynchronously"""
+    _check_intervals(poll_interval, max_poll_interval)
+
+    logger.info("\n*Publishing {0} workbook(s) to '{1}' project as {2}*".format(
+        len(workbook_file), dest_project, username))
+
+    ##### STEP 1: Sign in #####
+    ctx.phase("1. Sign in")
+    logger.info("\n1. Signing in as " + username)
+    session_mgr = SessionMgr(ctx, server, username, password)
+    auth_token, site_id, user_id = session_mgr.sign_in()
+
+    try:
+        ##### STEP 2: Find project id #####
+        ctx.phase("2. Find project id")
+        logger.info("\n2. Finding project id of '{0}'".format(dest_project))
+        workbook_mgr = WorkbookMgr(ctx, server, auth_token, site_id)
+        dest_project_id = workbook_mgr.get_project_id(dest_project)
+
+        ##### STEP 3: Queue publishes and wait for completion #####
+        ctx.phase("3. Queue publishes and wait for completion")
+        logger.info("\n3. Queuing {0} publish job(s), at most {1} at a time".format(len(workbook_file), max_concurrent))
+        job_mgr = JobMgr(ctx, server, auth_token, site_id, max_concurrent, poll_interval, max_poll_interval, timeout)
+        tasks = [(filename,
+                  lambda filename=filename: workbook_mgr.publish_workbook(filename, dest_project_id, as_job=True))
+                 for filename in workbook_file]
+        results = job_mgr.run(tasks)
+    finally:
+        ##### STEP 4: Sign out #####
+        ctx.phase("4. Sign out")
+        logger.info("\n4. Signing out and invalidating the authentication token")
+        session_mgr.sign_out(auth_token)
+
+    failed = [label for label, status in results.items() if status != 'Success']
+    if failed:
+        quit_on_error("Publish did not succeed for: {0}".format(', '.join(failed)))
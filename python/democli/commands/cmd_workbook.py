@@ -4,6 +4,7 @@ from democli.utils.click_util import common_options
 from democli.utils.log_util import create_logger
 from democli.auth.session_mgr import SessionMgr
 from democli.workbook.workbook_mgr import WorkbookMgr
+from democli.plan.plan_mgr import PlanMgr, Endpoint, Transfer
 
 logger = create_logger(__name__)
 
@@ -43,16 +44,19 @@ def move_to_project(ctx, server, username, password, workbook_name, dest_project
     logger.info("\n*Moving '{0}' workbook to '{1}' project as {2}*".format(workbook_name, dest_project, username))
 
     ##### STEP 1: Sign in #####
+    ctx.phase("1. Sign in")
     logger.info("\n1. Signing in as " + username)
     session_mgr = SessionMgr(server, username, password)
     auth_token, site_id, user_id = session_mgr.sign_in()
 
     ##### STEP 2: Find new project id #####
+    ctx.phase("2. Find new project id")
     logger.info("\n2. Finding project id of '{0}'".format(dest_project))
     workbook_mgr = WorkbookMgr(server, auth_token, site_id)
     dest_project_id = workbook_mgr.get_project_id(dest_project)
 
     ##### STEP 3: Find workbook id #####
+    ctx.phase("3. Find workbook id")
     logger.info("\n3. Finding workbook id of '{0}'".format(workbook_name))
     source_project_id, workbook_id = workbook_mgr.get_workbook_id(user_id, workbook_name)
 
@@ -62,18 +66,20 @@ def move_to_project(ctx, server, username, password, workbook_name, dest_project
         raise UserDefinedFieldError(error)
 
     ##### STEP 4: Move workbook #####
+    ctx.phase("4. Move workbook")
     logger.info("\n4. Moving workbook to '{0}'".format(dest_project))
     workbook_mgr.move_workbook(workbook_id, dest_project_id)
 
     ##### STEP 5: Sign out #####
+    ctx.phase("5. Sign out")
     logger.info("\n5. Signing out and invalidating the authentication token")
     session_mgr.sign_out(auth_token)
 
 
-@cli.command('move_to_server', short_help='Move workbook to destination server')
+@cli.command('move_to_server', short_help='Move workbooks to destination server')
 @common_options(_common_options)
 @click.option(
-    '-w', '--workbook_name', required=True, help='The name of workbook to move'
+    '-w', '--workbook_name', required=True, multiple=True, help='The name of workbook to move, can be repeated'
 )
 @click.option(
     '--dest_server', required=True, help='The destination server'
@@ -85,99 +91,65 @@ def move_to_project(ctx, server, username, password, workbook_name, dest_project
     '--dest_password', required=True, help='The destination user password'
 )
 @click.option(
-    '--dest_site_id', required=True, help='The destination site id'
+    '--dest_site_id', default='', help='The destination site id, the default site if not set'
+)
+@click.option(
+    '--dry_run', '--dry-run', 'dry_run', is_flag=True, help='Prints the plan and its estimates without moving anything'
 )
 @pass_context
-def move_to_server(ctx, server, username, password, workbook_name, dest_server, dest_username, dest_password):
-    """Move workbook to destination server"""
-
-    logger.info("\n*Moving '{0}' workbook to the 'default' project in {1}*".format(workbook_name, dest_server))
-
-    ##### STEP 1: Sign in #####
-    logger.info("\n1. Signing in to both sites to obtain authentication tokens")
-    # Source server
-    source_session_mgr = SessionMgr(server, username, password)
-    source_auth_token, source_site_id, source_user_id = source_session_mgr.sign_in()
-
-    # Destination server
-    dest_session_mgr = SessionMgr(dest_server, dest_username, dest_password)
-    dest_auth_token, dest_site_id, dest_user_id = dest_session_mgr.sign_in()
-
-    ##### STEP 2: Find workbook id #####
-    logger.info("\n2. Finding workbook id of '{0}'".format(workbook_name))
-    source_workbook_mgr = WorkbookMgr(server, source_auth_token, source_site_id)
-    workbook_id = source_workbook_mgr.get_workbook_id(source_user_id, workbook_name)
-
-    ##### STEP 3: Find 'default' project id for destination server #####
-    logger.info("\n3. Finding 'default' project id for {0}".format(dest_server))
-    dest_workbook_mgr = WorkbookMgr(dest_server, dest_auth_token, dest_site_id)
-    dest_project_id = dest_workbook_mgr.get_default_project_id()
+def move_to_server(ctx, server, username, password, workbook_name, dest_server, dest_username, dest_password,
+                   dest_site_id, dry_run):
+    """Move workbooks to destination server"""
 
-    ##### STEP 4: Download workbook #####
-    logger.info("\n4. Downloading the workbook to move")
-    workbook_filename = source_workbook_mgr.download(workbook_id)
+    logger.info("\n*Moving {0} workbook(s) to the 'default' project in {1}*".format(len(set(workbook_name)), dest_server))
 
-    ##### STEP 5: Publish to new site #####
-    logger.info("\n5. Publishing workbook to {0}".format(dest_server))
-    dest_workbook_mgr.publish_workbook(workbook_filename, dest_project_id)
+    source = Endpoint(server, username, password, '')
+    dest = Endpoint(dest_server, dest_username, dest_password, dest_site_id)
+    _run_plan(ctx, [Transfer(name, source, dest) for name in workbook_name], dry_run)
 
-    ##### STEP 6: Deleting workbook from the source site #####
-    logger.info("\n6. Deleting workbook from the original site and temp file")
-    source_workbook_mgr.delete_workbook(workbook_id, workbook_filename)
 
-    ##### STEP 7: Sign out #####
-    logger.info("\n7. Signing out and invalidating the authentication token")
-    source_session_mgr.sign_out(source_auth_token)
-    dest_session_mgr.sign_out(dest_auth_token)
-
-
-@cli.command('move_to_site', short_help='Move workbook to destination site')
+@cli.command('move_to_site', short_help='Move workbooks to destination site')
 @common_options(_common_options)
 @click.option(
-    '-w', '--workbook_name', required=True, help='The name of workbook to move'
+    '-w', '--workbook_name', required=True, multiple=True, help='The name of workbook to move, can be repeated'
 )
 @click.option(
     '--dest_site', required=True, help='The destination site id'
 )
+@click.option(
+    '--dry_run', '--dry-run', 'dry_run', is_flag=True, help='Prints the plan and its estimates without moving anything'
+)
 @pass_context
-def move_to_site(ctx, server, username, password, workbook_name, dest_site):
-    """Move workbook to destination site"""
-
-    logger.info("\n*Moving '{0}' workbook to the 'default' project in {1}*".format(workbook_name, dest_site))
-
-    ##### STEP 1: Sign in #####
-    logger.info("\n1. Signing in to both sites to obtain authentication tokens")
-    # Default site
-    source_session_mgr = SessionMgr(server, username, password)
-    source_auth_token, source_site_id, source_user_id = source_session_mgr.sign_in()
-
-    # Specified site
-    dest_session_mgr = SessionMgr(server, username, password, site=dest_site)
-    dest_auth_token, dest_site_id, dest_user_id = dest_session_mgr.sign_in()
-
-    ##### STEP 2: Find workbook id #####
-    logger.info("\n2. Finding workbook id of '{0}' from source site".format(workbook_name))
-    source_workbook_mgr = WorkbookMgr(server, source_auth_token, source_site_id)
-    workbook_id = source_workbook_mgr.get_workbook_id(source_user_id, workbook_name)
-
-    ##### STEP 3: Find 'default' project id for destination site #####
-    logger.info("\n3. Finding 'default' project id for destination site")
-    dest_workbook_mgr = WorkbookMgr(server, source_auth_token, dest_site_id)
-    dest_project_id = dest_workbook_mgr.get_default_project_id(server, dest_auth_token, dest_site_id)
-
-    ##### STEP 4: Download workbook #####
-    logger.info("\n4. Downloading the workbook to move from source site")
-    workbook_filename, workbook_content = source_workbook_mgr.download(workbook_id)
-
-    ##### STEP 5: Publish to new site #####
-    logger.info("\n5. Publishing workbook to destination site")
-    dest_workbook_mgr.publish_workbook(workbook_filename, workbook_content, dest_project_id)
-
-    ##### STEP 6: Deleting workbook from the source site #####
-    logger.info("\n6. Deleting workbook from the source site")
-    source_workbook_mgr.delete_workbook(workbook_id)
-
-    ##### STEP 7: Sign out #####
-    logger.info("\n7. Signing out and invalidating the authentication token")
-    source_session_mgr.sign_out(source_auth_token)
-    dest_session_mgr.sign_out(dest_auth_token)
+def move_to_site(ctx, server, username, password, workbook_name, dest_site, dry_run):
+    """Move workbooks to destination site"""
+
+    logger.info("\n*Moving {0} workbook(s) to the 'default' project in {1}*".format(len(set(workbook_name)), dest_site))
+
+    source = Endpoint(server, username, password, '')
+    dest = Endpoint(server, username, password, dest_site)
+    _run_plan(ctx, [Transfer(name, source, dest) for name in workbook_name], dry_run)
+
+
+def _run_plan(ctx, transfers, dry_run):
+    """Plans the transfers, then prints the plan or runs it"""
+
+    plan_mgr = PlanMgr(ctx, transfers)
+    try:
+        ##### STEP 1: Build plan #####
+        ctx.phase("1. Build plan")
+        logger.info("\n1. Signing in once per site and looking up workbooks and projects")
+        plan_mgr.build()
+        click.echo(plan_mgr.describe())
+
+        ##### STEP 2: Run plan #####
+        ctx.phase("2. Run plan")
+        if dry_run:
+            logger.info("\n2. Dry run, nothing was moved")
+        else:
+            logger.info("\n2. Downloading, publishing and deleting workbooks, largest first")
+            plan_mgr.execute()
+    finally:
+        ##### STEP 3: Sign out #####
+        ctx.phase("3. Sign out")
+        logger.info("\n3. Signing out and invalidating the authentication tokens")
+        plan_mgr.close()
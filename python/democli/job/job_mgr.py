@@ -0,0 +1,201 @@
+import time
+import requests
+from collections import deque
+from democli.utils.log_util import create_logger
+from democli.utils.http_util import check_status, xmlns
+from democli.utils.query_util import QueryBuilder
+from democli.utils.common_util import encode_for_display
+from democli.error_handlers.errors import ApiCallError
+from democli.version import VERSION
+import xml.etree.ElementTree as ET  # Contains methods used to build and parse XML
+
+logger = create_logger(__name__)
+
+# The maximum number of jobs that are queued on the server at the same time
+MAX_CONCURRENT = 10
+
+# Polling starts at the minimum interval and backs off to the maximum while no job finishes
+MIN_POLL_INTERVAL = 2  # seconds
+MAX_POLL_INTERVAL = 30  # seconds
+BACKOFF_FACTOR = 1.5
+
+# Job statuses which will not change any more
+FINISHED_STATUSES = ('Success', 'Failed', 'Cancelled', 'Unknown')
+
+# Status of a job by the 'finishCode' attribute of the Query Job response
+FINISH_CODES = {'0': 'Success', '1': 'Failed', '2': 'Cancelled'}
+
+# A job missing from, or failing, this many polls in a row is reported as 'Unknown'
+MAX_MISSED_POLLS = 5
+
+# Jobs are listed from this many seconds before the run started, to allow for clock skew
+CLOCK_SKEW = 300  # seconds
+
+
+# Class for managing asynchronous jobs
+class JobMgr:
+    def __init__(self, ctx, server, auth_token, site_id, max_concurrent=MAX_CONCURRENT,
+                 min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL, timeout=None):
+        """
+        'server'         specified server address
+        'auth_token'     authentication token that grants user access to API calls
+        'site_id'        ID of the site that the user is signed into
+        'max_concurrent' maximum number of jobs running at the same time
+        'min_interval'   initial number of seconds between two polls
+        'max_interval'   upper bound for the number of seconds between two polls
+        'timeout'        number of seconds after which unfinished jobs are reported as 'Unknown',
+                         or None to wait until every job has finished
+        """
+        if min_interval <= 0:
+            raise ValueError("The poll interval must be greater than 0")
+        if max_interval < min_interval:
+            raise ValueError("The maximum poll interval must not be smaller than the poll interval")
+        self.ctx = ctx
+        self.server = server
+        self.auth_token = auth_token
+        self.site_id = site_id
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+
+    def get_ids(self, resource, names):
+        """
+        Gets the ids of the named workbooks or datasources with a single filtered query.
+
+        'resource'  either 'workbook' or 'datasource'
+        'names'     names of the items to look up
+        Returns a dictionary of name: id.
+        """
+        url = self.server + "/api/{0}/sites/{1}/{2}s".format(VERSION, self.site_id, resource)
+        query = QueryBuilder(url).fields('id', 'name')
+        items = query.fetch_by_name(self.auth_token, resource, names)
+        return dict((name, item.get('id')) for name, item in items.items())
+
+    def refresh(self, resource, item_id):
+        """
+        Queues an extract refresh for a workbook or datasource.
+
+        'resource'  either 'workbook' or 'datasource'
+        'item_id'   ID of the workbook or datasource to refresh
+        Returns the ID of the job created on the server.
+        """
+        url = self.server + "/api/{0}/sites/{1}/{2}s/{3}/refresh".format(VERSION, self.site_id, resource, item_id)
+        xml_request = ET.tostring(ET.Element('tsRequest'))
+
+        server_response = requests.post(url, data=xml_request,
+                                        headers={'x-tableau-auth': self.auth_token, 'content-type': 'text/xml'})
+        check_status(server_response, 202)
+        xml_response = ET.fromstring(encode_for_display(server_response.text))
+        return xml_response.find('t:job', namespaces=xmlns).get('id')
+
+    def query_jobs(self, job_ids, since):
+        """
+        Gets the status of several jobs. One Query Jobs request lists every job created
+        since the run started; jobs missing from that list are queried one at a time.
+
+        'job_ids'   IDs of the jobs to look up
+        'since'     earliest creation time of the jobs, as an ISO 8601 UTC timestamp
+        Returns a dictionary of job id: status. Jobs the server no longer knows are left out.
+        """
+        job_ids = set(job_ids)
+        statuses = {}
+
+        url = self.server + "/api/{0}/sites/{1}/jobs".format(VERSION, self.site_id)
+        query = QueryBuilder(url).filter('createdAt', 'gte', since)
+        try:
+            # Never fall back to listing every background job on the site
+            for job in query.fetch(self.auth_token, 'backgroundJob', fallback=False):
+                if job.get('id') in job_ids:
+                    statuses[job.get('id')] = job.get('status')
+        except ApiCallError as e:
+            logger.debug("Query Jobs failed, querying jobs one at a time: {0}".format(e))
+
+        for job_id in job_ids - set(statuses):
+            url = self.server + "/api/{0}/sites/{1}/jobs/{2}".format(VERSION, self.site_id, job_id)
+            server_response = requests.get(url, headers={'x-tableau-auth': self.auth_token})
+            if server_response.status_code == 404:
+                continue
+            check_status(server_response, 200)
+            xml_response = ET.fromstring(encode_for_display(server_response.text))
+            job = xml_response.find('t:job', namespaces=xmlns)
+            if job.get('completedAt') is None:
+                statuses[job_id] = 'InProgress'
+            else:
+                statuses[job_id] = FINISH_CODES.get(job.get('finishCode'), 'Unknown')
+        return statuses
+
+    def run(self, tasks):
+        """
+        Starts the tasks while keeping at most 'max_concurrent' jobs active, and polls
+        the active jobs until every job has finished or the timeout is reached.
+
+        'tasks'     list of (label, start) pairs; 'start' is a callable returning a job ID
+        Returns a dictionary of label: final status. A task which could not be started is
+        'Failed'; a job that went missing or did not finish before the timeout is 'Unknown';
+        a task still waiting to start at the timeout is 'NotStarted'.
+        """
+        pending = deque(tasks)
+        active = {}
+        missed = {}
+        results = {}
+        interval = self.min_interval
+        started = time.time()
+        since = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(started - CLOCK_SKEW))
+        deadline = started + self.timeout if self.timeout is not None else None
+
+        while pending or active:
+            if deadline is not None and time.time() >= deadline:
+                for label in active.values():
+                    logger.warning("Timed out waiting for '{0}'".format(label))
+                    results[label] = 'Unknown'
+                for label, start in pending:
+                    logger.warning("Timed out before starting '{0}'".format(label))
+                    results[label] = 'NotStarted'
+                break
+
+            # Top up the active jobs to the concurrency cap
+            while pending and len(active) < self.max_concurrent:
+                label, start = pending.popleft()
+                try:
+                    job_id = start()
+                except (ApiCallError, requests.RequestException, EnvironmentError) as e:
+                    logger.error("Could not start job for '{0}': {1}".format(label, e))
+                    results[label] = 'Failed'
+                    continue
+                self.ctx.vlog("Queued job %s for '%s'", job_id, label)
+                active[job_id] = label
+                missed[job_id] = 0
+            if not active:
+                continue
+
+            time.sleep(interval)
+            try:
+                statuses = self.query_jobs(active.keys(), since)
+            except (ApiCallError, requests.RequestException) as e:
+                # A failed poll counts as a missed poll for every active job
+                logger.warning("Polling jobs failed: {0}".format(e))
+                statuses = {}
+
+            finished = []
+            for job_id in list(active):
+                status = statuses.get(job_id)
+                if status is None:
+                    missed[job_id] += 1
+                    if missed[job_id] < MAX_MISSED_POLLS:
+                        continue
+                    status = 'Unknown'
+                elif status not in FINISHED_STATUSES:
+                    missed[job_id] = 0
+                    continue
+                label = active.pop(job_id)
+                results[label] = status
+                finished.append(job_id)
+                logger.info("Job {0} for '{1}' finished: {2}".format(job_id, label, status))
+
+            # Poll quickly while jobs are finishing, back off while they are not
+            if finished:
+                interval = self.min_interval
+            else:
+                interval = min(interval * BACKOFF_FACTOR, self.max_interval)
+        return results
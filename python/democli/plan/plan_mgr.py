@@ -0,0 +1,172 @@
+import os
+import math
+from collections import namedtuple, OrderedDict
+from democli.utils.log_util import create_logger
+from democli.auth.session_mgr import SessionMgr
+from democli.workbook.workbook_mgr import WorkbookMgr, FILESIZE_LIMIT, CHUNK_SIZE
+from democli.error_handlers.errors import UserDefinedFieldError
+
+logger = create_logger(__name__)
+
+# The REST API reports workbook sizes in whole megabytes, so sizes are approximate
+SIZE_UNIT = 1024 * 1024  # 1MB
+
+# A server and site to sign in to, with the credentials to use
+Endpoint = namedtuple('Endpoint', 'server username password site')
+
+# An intended move of the named workbook from the source endpoint to the 'default' project of the destination
+Transfer = namedtuple('Transfer', 'workbook_name source dest')
+
+# A resolved transfer, ready to run
+Step = namedtuple('Step', 'transfer workbook_id size dest_project_id')
+
+# A signed in endpoint
+Session = namedtuple('Session', 'session_mgr auth_token user_id workbook_mgr')
+
+
+# Class for planning and running a batch of workbook transfers with a minimal number of calls
+class PlanMgr:
+    def __init__(self, ctx, transfers):
+        """
+        'transfers'     list of Transfer to plan
+        """
+        self.ctx = ctx
+        # Identical transfers are only planned once
+        self.transfers = list(OrderedDict.fromkeys(transfers))
+        self.sessions = OrderedDict()
+        self.steps = []
+
+        # A workbook is deleted from its source once moved, so it cannot be moved twice
+        destinations = {}
+        for transfer in self.transfers:
+            # Publishing into the same site overwrites the workbook that is deleted afterwards
+            if (transfer.source.server, transfer.source.site) == (transfer.dest.server, transfer.dest.site):
+                error = "Workbook '{0}' cannot be moved to the site it is in".format(transfer.workbook_name)
+                raise UserDefinedFieldError(error)
+            key = (transfer.workbook_name, transfer.source)
+            if destinations.setdefault(key, transfer.dest) != transfer.dest:
+                error = "Workbook '{0}' cannot be moved to more than one destination".format(transfer.workbook_name)
+                raise UserDefinedFieldError(error)
+
+    def build(self):
+        """
+        Signs in once per endpoint, looks up every workbook and destination project once,
+        and orders the transfers largest-first. Nothing is modified on the servers.
+        """
+        sources = OrderedDict((transfer.source, None) for transfer in self.transfers)
+        dests = OrderedDict((transfer.dest, None) for transfer in self.transfers)
+
+        for endpoint in list(sources) + list(dests):
+            if endpoint not in self.sessions:
+                self.sessions[endpoint] = self._sign_in(endpoint)
+
+        # One filtered query per source endpoint for all of its workbooks
+        workbooks = {}
+        for endpoint in sources:
+            session = self.sessions[endpoint]
+            names = list(OrderedDict.fromkeys(t.workbook_name for t in self.transfers if t.source == endpoint))
+            for name, workbook in session.workbook_mgr.get_workbooks(session.user_id, names).items():
+                workbooks[(name, endpoint)] = workbook
+
+        # One lookup per destination endpoint for its 'default' project
+        for endpoint in dests:
+            dests[endpoint] = self.sessions[endpoint].workbook_mgr.get_default_project_id()
+
+        for transfer in self.transfers:
+            workbook = workbooks[(transfer.workbook_name, transfer.source)]
+            # Workbooks under 1MB are reported as 0, count them as 1MB
+            size = max(int(workbook.get('size') or 0), 1) * SIZE_UNIT
+            self.steps.append(Step(transfer, workbook.get('id'), size, dests[transfer.dest]))
+        self.steps.sort(key=lambda step: step.size, reverse=True)
+        return self
+
+    def estimate(self):
+        """
+        Returns the estimated number of calls and bytes transferred by the plan, and the
+        number of calls the same transfers would take when run one at a time.
+        """
+        sources = set(step.transfer.source for step in self.steps)
+        dests = set(step.transfer.dest for step in self.steps)
+        transfer_calls = sum(_transfer_calls(step.size) for step in self.steps)
+
+        # Sign in and out once per endpoint, one lookup per source and destination
+        calls = 2 * len(self.sessions) + len(sources) + len(dests) + transfer_calls
+        # Each workbook is downloaded once and uploaded once
+        transferred = sum(2 * step.size for step in self.steps)
+        # One at a time: sign in and out of both sites, look up workbook and project for each transfer
+        unplanned_calls = 6 * len(self.steps) + transfer_calls
+        return calls, transferred, unplanned_calls
+
+    def describe(self):
+        """
+        Returns the plan and its estimates as text.
+        """
+        lines = ["Sign in to {0} endpoint(s):".format(len(self.sessions))]
+        for endpoint in self.sessions:
+            lines.append("\t{0} (site '{1}') as {2}".format(endpoint.server, endpoint.site, endpoint.username))
+        lines.append("Transfer {0} workbook(s), largest first:".format(len(self.steps)))
+        for step in self.steps:
+            lines.append("\t'{0}' (~{1} MB) from {2} to {3}".format(step.transfer.workbook_name, step.size // SIZE_UNIT,
+                                                                     step.transfer.source.server,
+                                                                     step.transfer.dest.server))
+
+        calls, transferred, unplanned_calls = self.estimate()
+        lines.append("Estimated calls: {0} (vs {1} one at a time)".format(calls, unplanned_calls))
+        lines.append("Estimated data transferred: ~{0} MB (sizes are rounded to whole MB, "
+                     "at least 1 MB each)".format(transferred // SIZE_UNIT))
+        return '\n'.join(lines)
+
+    def execute(self):
+        """
+        Downloads, publishes and deletes each workbook in plan order. If a step fails,
+        logs which workbooks were moved and which were not before re-raising.
+        """
+        moved = []
+        for step in self.steps:
+            logger.info("\nMoving '{0}' to {1}".format(step.transfer.workbook_name, step.transfer.dest.server))
+            source_workbook_mgr = self.sessions[step.transfer.source].workbook_mgr
+            dest_workbook_mgr = self.sessions[step.transfer.dest].workbook_mgr
+
+            workbook_filename = None
+            try:
+                workbook_filename = source_workbook_mgr.download(step.workbook_id)
+                dest_workbook_mgr.publish_workbook(workbook_filename, step.dest_project_id)
+                source_workbook_mgr.delete_workbook(step.workbook_id, workbook_filename)
+            except Exception:
+                not_moved = [s.transfer.workbook_name for s in self.steps[len(moved):]]
+                logger.error("Moving '{0}' failed. Moved: {1}. Not moved: {2}".format(
+                    step.transfer.workbook_name, ', '.join(moved) or 'none', ', '.join(not_moved)))
+                raise
+            finally:
+                # delete_workbook removes the temp file, unless an earlier call failed
+                if workbook_filename is not None and os.path.exists(workbook_filename):
+                    os.remove(workbook_filename)
+            moved.append(step.transfer.workbook_name)
+
+    def close(self):
+        """
+        Signs out of every endpoint that was signed in to.
+        """
+        for session in self.sessions.values():
+            session.session_mgr.sign_out(session.auth_token)
+        self.sessions.clear()
+
+    def _sign_in(self, endpoint):
+        """
+        Returns the Session for the endpoint.
+        """
+        session_mgr = SessionMgr(self.ctx, endpoint.server, endpoint.username, endpoint.password, site=endpoint.site)
+        auth_token, site_id, user_id = session_mgr.sign_in()
+        return Session(session_mgr, auth_token, user_id, WorkbookMgr(self.ctx, endpoint.server, auth_token, site_id))
+
+
+def _transfer_calls(size):
+    """
+    Returns the number of calls to download, publish and delete a workbook of the given size.
+    """
+    if size >= FILESIZE_LIMIT:
+        # Start an upload session, append each chunk, then commit the upload
+        publish_calls = 2 + int(math.ceil(size / float(CHUNK_SIZE)))
+    else:
+        publish_calls = 1
+    return 1 + publish_calls + 1
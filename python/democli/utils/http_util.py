@@ -6,6 +6,9 @@ import xml.etree.ElementTree as ET # Contains methods used to build and parse XM
 from requests.packages.urllib3.fields import RequestField
 from requests.packages.urllib3.filepost import encode_multipart_formdata
 
+# The namespace for the REST API is 'http://tableau.com/api'
+xmlns = {'t': 'http://tableau.com/api'}
+
 
 def check_status(server_response, success_code):
     """
@@ -0,0 +1,135 @@
+import io
+import time
+import pstats
+import cProfile
+import tracemalloc
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+# The number of allocation sites and functions listed for each phase
+TOP_COUNT = 10
+
+# Allocations made by the profiler itself are not reported
+_IGNORED = (
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+# Class for collecting memory and cpu profiles of a command, one phase at a time
+class Profiler:
+    def __init__(self, output):
+        """
+        'output'    filename the report is written to
+        """
+        self.output = output
+        self.phases = []
+        self.current = None
+
+    def start(self):
+        """Starts tracing allocations and opens the first phase."""
+        tracemalloc.start()
+        self.phase('setup')
+
+    def phase(self, name):
+        """
+        Closes the current phase and opens a new one.
+
+        'name'  label of the phase in the report
+        """
+        self._close_phase()
+
+        # Python 3.9+ can reset the peak alone; older versions have to drop the traces too
+        if not hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.clear_traces()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        # Measured after the snapshot, so keeping it for the phase does not count towards the peak
+
+        profile = cProfile.Profile()
+        self.current = {
+            'name': name,
+            'started': time.time(),
+            'baseline': tracemalloc.get_traced_memory()[0],
+            'snapshot': snapshot,
+            'profile': profile,
+        }
+        profile.enable()
+
+    def stop(self):
+        """Closes the last phase, stops tracing and writes the report."""
+        self._close_phase()
+        tracemalloc.stop()
+        with open(self.output, 'w') as f:
+            f.write(self.report())
+
+    def report(self):
+        """
+        Returns the report as text: for each phase the duration, the memory peak,
+        the top allocation sites and the hot functions.
+        """
+        lines = []
+        highest_peak = max([phase['peak'] for phase in self.phases] or [0])
+        lines.append("Highest phase peak: {0}".format(_format_size(highest_peak)))
+        if resource is not None:
+            # ru_maxrss is reported in KiB on Linux
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+            lines.append("Process peak RSS: {0}".format(_format_size(max_rss)))
+        for phase in self.phases:
+            lines.append('')
+            lines.append("=== Phase '{0}' ===".format(phase['name']))
+            lines.append("Duration: {0:.3f}s".format(phase['duration']))
+            lines.append("Peak above phase start: {0}".format(_format_size(phase['peak'])))
+            lines.append("Net allocated: {0}".format(_format_size(phase['net'])))
+            lines.append('')
+            lines.append("Top {0} allocation sites:".format(TOP_COUNT))
+            for stat in phase['allocations']:
+                frame = stat.traceback[0]
+                lines.append("  {0}:{1}: {2} in {3} blocks".format(
+                    frame.filename, frame.lineno, _format_size(stat.size_diff), stat.count_diff))
+            lines.append('')
+            lines.append("Top {0} functions by cumulative time:".format(TOP_COUNT))
+            lines.append(phase['functions'])
+        return '\n'.join(lines) + '\n'
+
+    def _close_phase(self):
+        """Records the statistics of the current phase, if any."""
+        if self.current is None:
+            return
+        phase, self.current = self.current, None
+        phase['profile'].disable()
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        allocations = snapshot.compare_to(phase['snapshot'], 'lineno')
+
+        stream = io.StringIO()
+        stats = pstats.Stats(phase['profile'], stream=stream)
+        # Leave out the profiler's own frames and the call that stopped it
+        stats.stats = dict((key, value) for key, value in stats.stats.items()
+                           if key[0] != __file__ and '_lsprof.Profiler' not in key[2])
+        stats.sort_stats('cumulative').print_stats(TOP_COUNT)
+
+        self.phases.append({
+            'name': phase['name'],
+            'duration': time.time() - phase['started'],
+            'peak': peak - phase['baseline'],
+            'net': sum(stat.size_diff for stat in allocations),
+            'allocations': allocations[:TOP_COUNT],
+            'functions': stream.getvalue(),
+        })
+
+
+def _format_size(size):
+    """Returns a byte count in a human readable unit."""
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return "{0:.1f} {1}".format(size, unit)
+        size /= 1024.0
+    return "{0:.1f} GiB".format(size)
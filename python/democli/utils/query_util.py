@@ -0,0 +1,238 @@
+import math
+import requests
+from urllib.parse import quote
+from democli.utils.log_util import create_logger
+from democli.utils.http_util import check_status, xmlns
+from democli.utils.common_util import encode_for_display
+import xml.etree.ElementTree as ET  # Contains methods used to build and parse XML
+
+logger = create_logger(__name__)
+
+# Default paginating values
+PAGE_SIZE = 100
+
+# Characters which are part of the REST API filter/sort grammar and therefore
+# cannot appear in a value sent to the server, even when escaped
+RESERVED_CHARS = (',', ':', '[', ']')
+
+# Operators which compare dates such as createdAt:gte:2020-01-01T00:00:00Z, whose
+# values are allowed to contain ':'
+ORDERING_OPERATORS = ('gt', 'gte', 'lt', 'lte')
+
+# Client-side equivalents of the REST API filter operators, applied by matches()
+# to the attribute text and the expected value converted by _normalize()
+OPERATORS = {
+    'eq': lambda actual, expected: actual == expected,
+    'in': lambda actual, expected: actual in expected,
+    'has': lambda actual, expected: expected in actual,
+    'gt': lambda actual, expected: actual > expected,
+    'gte': lambda actual, expected: actual >= expected,
+    'lt': lambda actual, expected: actual < expected,
+    'lte': lambda actual, expected: actual <= expected,
+}
+
+
+# Class for building list queries with server-side filtering, field selection and sorting
+class QueryBuilder:
+    def __init__(self, url):
+        """
+        'url'   the list endpoint to query, without any query string
+        """
+        self.url = url
+        self.filters = []
+        self.field_names = []
+        self.sorts = []
+        self.page_size = PAGE_SIZE
+
+    def filter(self, field, operator, value):
+        """
+        Adds a filter expression, e.g. filter('name', 'eq', 'Sales').
+
+        'field'     name of the attribute to filter on
+        'operator'  one of the REST API filter operators (eq, in, has, gt, gte, lt, lte)
+        'value'     value to compare against; a list or tuple for the 'in' operator
+        Returns the builder so calls can be chained.
+        """
+        if operator not in OPERATORS:
+            raise ValueError("Unsupported filter operator '{0}'".format(operator))
+        self.filters.append((field, operator, value))
+        return self
+
+    def fields(self, *names):
+        """
+        Restricts the attributes returned by the server, e.g. fields('id', 'name', 'project.id').
+
+        Returns the builder so calls can be chained.
+        """
+        self.field_names.extend(names)
+        return self
+
+    def sort(self, field, direction='asc'):
+        """
+        Adds a sort expression.
+
+        'field'     name of the attribute to sort on
+        'direction' either 'asc' or 'desc'
+        Returns the builder so calls can be chained.
+        """
+        self.sorts.append((field, direction))
+        return self
+
+    def server_side(self):
+        """
+        Returns True if every filter value can be expressed in the REST API filter grammar.
+        """
+        for field, operator, value in self.filters:
+            values = value if operator == 'in' else [value]
+            reserved = [c for c in RESERVED_CHARS if c != ':' or operator not in ORDERING_OPERATORS]
+            for item in values:
+                if any(char in str(item) for char in reserved):
+                    return False
+        return True
+
+    def build(self, page_num=1, server_side=True):
+        """
+        Builds the url for the requested page.
+
+        'page_num'      page number to request
+        'server_side'   whether to send filter, fields and sort parameters to the server
+        Returns the url with its query string.
+        """
+        params = ["pageSize={0}".format(self.page_size), "pageNumber={0}".format(page_num)]
+        if server_side:
+            expressions = []
+            for field, operator, value in self.filters:
+                # Values are escaped so characters such as '#', '+' or '%' reach the server unchanged
+                if operator == 'in':
+                    value = '[{0}]'.format(','.join(_escape(item) for item in value))
+                else:
+                    value = _escape(value)
+                expressions.append('{0}:{1}:{2}'.format(_escape(field), operator, value))
+            if expressions:
+                params.append('filter=' + ','.join(expressions))
+            if self.field_names:
+                params.append('fields=' + ','.join(_escape(f) for f in self.field_names))
+            if self.sorts:
+                params.append('sort=' + ','.join('{0}:{1}'.format(_escape(f), _escape(d)) for f, d in self.sorts))
+        return self.url + '?' + '&'.join(params)
+
+    def matches(self, element, server_side=False):
+        """
+        Applies the filters client-side to a parsed XML element.
+
+        'element'       parsed element to check
+        'server_side'   whether the server already applied the filters; fields such as
+                        ownerName or tags, which are not returned as attributes, are then
+                        trusted instead of re-checked
+        Returns True if the element satisfies every filter.
+        """
+        for field, operator, value in self.filters:
+            actual = element.get(field)
+            if actual is None:
+                if server_side:
+                    continue
+                return False
+            actual, expected = _normalize(operator, actual, value)
+            if not OPERATORS[operator](actual, expected):
+                return False
+        return True
+
+    def fetch(self, auth_token, tag, fallback=True):
+        """
+        Runs the query, falling back to client-side filtering when the server rejects
+        the filter, fields or sort parameters or when a value cannot be sent to it.
+
+        'auth_token'    authentication token that grants user access to API calls
+        'tag'           name of the element to collect from the response, e.g. 'workbook'
+        'fallback'      whether to fall back to client-side filtering; when not set, a
+                        rejected query raises ApiCallError instead of listing every page
+        Returns the list of matching elements.
+        """
+        server_side = self.server_side() and bool(self.filters or self.field_names or self.sorts)
+        if not server_side and not fallback:
+            raise ValueError("Query cannot be filtered by the server")
+        if server_side:
+            server_response = requests.get(self.build(), headers={'x-tableau-auth': auth_token})
+            if server_response.status_code == 400 and fallback:
+                logger.warning("Server rejected query parameters, falling back to client-side filtering")
+                server_side = False
+        if not server_side:
+            server_response = requests.get(self.build(server_side=False), headers={'x-tableau-auth': auth_token})
+        check_status(server_response, 200)
+
+        elements = self._collect(server_response, auth_token, tag, server_side)
+        if not server_side:
+            # Only attributes of the returned elements can be filtered client-side
+            for field, operator, value in self.filters:
+                if elements and all(element.get(field) is None for element in elements):
+                    error = "Field '{0}' cannot be filtered client-side".format(field)
+                    raise ValueError(error)
+        return [element for element in elements if self.matches(element, server_side)]
+
+    def fetch_by_name(self, auth_token, tag, names):
+        """
+        Runs the query with a name filter for the given names.
+
+        'auth_token'    authentication token that grants user access to API calls
+        'tag'           name of the element to collect from the response, e.g. 'workbook'
+        'names'         names of the items to look up
+        Returns a dictionary of name: element. Raises LookupError when a name is missing
+        or, since names are only unique per project, matches more than one item.
+        """
+        self.filter('name', 'in', list(names))
+        elements = {}
+        for element in self.fetch(auth_token, tag):
+            if element.get('name') in elements:
+                error = "More than one {0} named '{1}' found.".format(tag, element.get('name'))
+                raise LookupError(error)
+            elements[element.get('name')] = element
+
+        missing = [name for name in names if name not in elements]
+        if missing:
+            error = "{0} named '{1}' not found.".format(tag.capitalize(), "', '".join(missing))
+            raise LookupError(error)
+        return elements
+
+    def _collect(self, server_response, auth_token, tag, server_side):
+        """
+        Parses the first page and requests any remaining pages.
+
+        Returns all elements named 'tag' across the pages.
+        """
+        xml_response = ET.fromstring(encode_for_display(server_response.text))
+        elements = xml_response.findall('.//t:{0}'.format(tag), namespaces=xmlns)
+
+        # Used to determine if more requests are required to fetch all elements
+        pagination = xml_response.find('t:pagination', namespaces=xmlns)
+        if pagination is None:
+            return elements
+        max_page = int(math.ceil(int(pagination.get('totalAvailable')) / float(self.page_size)))
+
+        for page in range(2, max_page + 1):
+            server_response = requests.get(self.build(page, server_side), headers={'x-tableau-auth': auth_token})
+            check_status(server_response, 200)
+            xml_response = ET.fromstring(encode_for_display(server_response.text))
+            elements.extend(xml_response.findall('.//t:{0}'.format(tag), namespaces=xmlns))
+        return elements
+
+
+def _escape(value):
+    """Percent-encodes a value for use inside a filter, fields or sort parameter."""
+    return quote(str(value), safe='')
+
+
+def _normalize(operator, actual, expected):
+    """
+    Converts an attribute value and the expected filter value to comparable types.
+    Ordering operators compare numbers as numbers and anything else, such as dates, as text.
+
+    Returns the converted attribute value and expected value.
+    """
+    if operator == 'in':
+        return actual, [str(item) for item in expected]
+    if operator in ORDERING_OPERATORS:
+        try:
+            return float(actual), float(expected)
+        except ValueError:
+            pass
+    return actual, str(expected)
@@ -1,6 +1,7 @@
-import requests, os
+import requests, os, re
 from democli.utils.log_util import create_logger
-from democli.utils.http_util import check_status, make_multipart
+from democli.utils.http_util import check_status, make_multipart, xmlns
+from democli.utils.query_util import QueryBuilder
 from democli.utils.common_util import encode_for_display
 from democli.version import VERSION
 import xml.etree.ElementTree as ET  # Contains methods used to build and parse XML
@@ -36,18 +37,44 @@ class WorkbookMgr:
         Returns the workbook id and the project id that contains the workbook.
         """
         url = self.server + "/api/{0}/sites/{1}/users/{2}/workbooks".format(VERSION, self.site_id, user_id)
-        server_response = requests.get(url, headers={'x-tableau-auth': self.auth_token})
-        check_status(server_response, 200)
-        xml_response = ET.fromstring(encode_for_display(server_response.text))
+        query = QueryBuilder(url).filter('name', 'eq', workbook_name).fields('id', 'name', 'project.id')
+        workbooks = query.fetch(self.auth_token, 'workbook')
 
-        workbooks = xml_response.findall('.//t:workbook', namespaces=xmlns)
-        for workbook in workbooks:
-            if workbook.get('name') == workbook_name:
-                source_project_id = workbook.find('.//t:project', namespaces=xmlns).get('id')
-                return source_project_id, workbook.get('id')
+        # The name filter is applied by the server when supported, otherwise client-side
+        if workbooks:
+            source_project_id = workbooks[0].find('.//t:project', namespaces=xmlns).get('id')
+            return source_project_id, workbooks[0].get('id')
         error = "Workbook named '{0}' not found.".format(workbook_name)
         raise LookupError(error)
 
+    def get_workbooks(self, user_id, workbook_names):
+        """
+        Gets several workbooks with a single filtered query.
+
+        'user_id'           ID of user with access to the workbooks
+        'workbook_names'    names of workbooks to look up
+        Returns a dictionary of name: workbook element, with id, name, size and project.
+        """
+        url = self.server + "/api/{0}/sites/{1}/users/{2}/workbooks".format(VERSION, self.site_id, user_id)
+        query = QueryBuilder(url).fields('id', 'name', 'size', 'project.id')
+        return query.fetch_by_name(self.auth_token, 'workbook', workbook_names)
+
+    def get_project_id(self, project_name):
+        """
+        Gets the id of the desired project.
+
+        'project_name'  name of project to get ID of
+        Returns the project id.
+        """
+        url = self.server + "/api/{0}/sites/{1}/projects".format(VERSION, self.site_id)
+        query = QueryBuilder(url).filter('name', 'eq', project_name).fields('id', 'name')
+        projects = query.fetch(self.auth_token, 'project')
+
+        if projects:
+            return projects[0].get('id')
+        error = "Project named '{0}' not found.".format(project_name)
+        raise LookupError(error)
+
     def move_workbook(self, workbook_id, project_id):
         """
         Moves the specified workbook to another project.
@@ -70,33 +97,14 @@ class WorkbookMgr:
         Returns the project ID for the 'default' project on the Tableau server.
 
         """
-        page_num, page_size = 1, 100  # Default paginating values
-
         # Builds the request
         url = self.server + "/api/{0}/sites/{1}/projects".format(VERSION, self.site_id)
-        paged_url = url + "?pageSize={0}&pageNumber={1}".format(page_size, page_num)
-        server_response = requests.get(paged_url, headers={'x-tableau-auth': self.auth_token})
-        check_status(server_response, 200)
-        xml_response = ET.fromstring(encode_for_display(server_response.text))
+        query = QueryBuilder(url).filter('name', 'in', ['default', 'Default']).fields('id', 'name')
+        projects = query.fetch(self.auth_token, 'project')
 
-        # Used to determine if more requests are required to find all projects on server
-        total_projects = int(xml_response.find('t:pagination', namespaces=xmlns).get('totalAvailable'))
-        max_page = int(math.ceil(total_projects / page_size))
-
-        projects = xml_response.findall('.//t:project', namespaces=xmlns)
-
-        # Continue querying if more projects exist on the server
-        for page in range(2, max_page + 1):
-            paged_url = url + "?pageSize={0}&pageNumber={1}".format(page_size, page)
-            server_response = requests.get(paged_url, headers={'x-tableau-auth': self.auth_token})
-            check_status(server_response, 200)
-            xml_response = ET.fromstring(encode_for_display(server_response.text))
-            projects.extend(xml_response.findall('.//t:project', namespaces=xmlns))
-
-        # Look through all projects to find the 'default' one
-        for project in projects:
-            if project.get('name') == 'default' or project.get('name') == 'Default':
-                return project.get('id')
+        # Look through the matching projects to find the 'default' one
+        if projects:
+            return projects[0].get('id')
         raise LookupError("Project named 'default' was not found on server")
 
     def start_upload_session(self):
@@ -129,12 +137,14 @@ class WorkbookMgr:
             f.write(server_response.content)
         return filename
 
-    def publish_workbook(self, workbook_filename, dest_project_id):
+    def publish_workbook(self, workbook_filename, dest_project_id, as_job=False):
         """
         Publishes the workbook to the desired project.
 
         'workbook_filename' filename of workbook to publish
         'dest_project_id'   ID of peoject to publish to
+        'as_job'            whether the server should publish asynchronously
+        Returns the ID of the publish job when 'as_job' is set.
         """
         workbook_name, file_extension = workbook_filename.split('.', 1)
         workbook_size = os.path.getsize(workbook_filename)
@@ -188,10 +198,17 @@ class WorkbookMgr:
             publish_url = self.server + "/api/{0}/sites/{1}/workbooks".format(VERSION, self.site_id)
             publish_url += "?workbookType={0}&overwrite=true".format(file_extension)
 
+        if as_job:
+            publish_url += "&asJob=true"
+
         # Make the request to publish and check status code
         print("\tUploading...")
         server_response = requests.post(publish_url, data=payload,
                                         headers={'x-tableau-auth': self.auth_token, 'content-type': content_type})
+        if as_job:
+            check_status(server_response, 202)
+            xml_response = ET.fromstring(encode_for_display(server_response.text))
+            return xml_response.find('t:job', namespaces=xmlns).get('id')
         check_status(server_response, 201)
 
     def delete_workbook(self, workbook_id, workbook_filename):
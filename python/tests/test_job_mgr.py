@@ -0,0 +1,105 @@
+import itertools
+import unittest
+import requests
+from unittest import mock
+from democli.error_handlers.errors import ApiCallError
+from democli.job.job_mgr import JobMgr, MAX_MISSED_POLLS
+
+
+def _fail():
+    raise ApiCallError('409093: Resource Conflict - refresh already queued')
+
+
+@mock.patch('democli.job.job_mgr.time.sleep')
+class JobMgrRunTest(unittest.TestCase):
+    def setUp(self):
+        self.job_mgr = JobMgr(mock.Mock(), 'http://server', 'token', 'site-id', max_concurrent=2)
+
+    def test_concurrency_cap(self, sleep):
+        polled = []
+
+        def query_jobs(job_ids, since):
+            polled.append(sorted(job_ids))
+            return dict((job_id, 'Success') for job_id in job_ids)
+
+        self.job_mgr.query_jobs = query_jobs
+        results = self.job_mgr.run([(label, lambda label=label: 'job-' + label) for label in 'abc'])
+
+        self.assertEqual(results, {'a': 'Success', 'b': 'Success', 'c': 'Success'})
+        self.assertEqual(polled, [['job-a', 'job-b'], ['job-c']])
+
+    def test_missing_job_is_unknown(self, sleep):
+        self.job_mgr.query_jobs = mock.Mock(return_value={})
+        results = self.job_mgr.run([('a', lambda: 'job-a')])
+
+        self.assertEqual(results, {'a': 'Unknown'})
+        self.assertEqual(self.job_mgr.query_jobs.call_count, MAX_MISSED_POLLS)
+
+    def test_failed_start_does_not_stop_run(self, sleep):
+        self.job_mgr.query_jobs = lambda job_ids, since: dict((job_id, 'Success') for job_id in job_ids)
+        results = self.job_mgr.run([('a', _fail), ('b', lambda: 'job-b')])
+
+        self.assertEqual(results, {'a': 'Failed', 'b': 'Success'})
+
+    @mock.patch('democli.job.job_mgr.time.time')
+    def test_timeout(self, time, sleep):
+        time.side_effect = itertools.chain([0, 0], itertools.repeat(10))
+        self.job_mgr.timeout = 5
+        self.job_mgr.query_jobs = mock.Mock(return_value={'job-a': 'InProgress'})
+        results = self.job_mgr.run([('a', lambda: 'job-a'), ('b', lambda: 'job-b'), ('c', lambda: 'job-c')])
+
+        self.assertEqual(results, {'a': 'Unknown', 'b': 'Unknown', 'c': 'NotStarted'})
+
+    def test_failed_poll_counts_as_missed(self, sleep):
+        self.job_mgr.query_jobs = mock.Mock(side_effect=[ApiCallError('500: Internal Server Error'),
+                                                         requests.ConnectionError('connection reset'),
+                                                         {'job-a': 'Success'}])
+        results = self.job_mgr.run([('a', lambda: 'job-a')])
+
+        self.assertEqual(results, {'a': 'Success'})
+
+    def test_invalid_intervals(self, sleep):
+        self.assertRaises(ValueError, JobMgr, mock.Mock(), 'http://server', 'token', 'site-id', min_interval=0)
+        self.assertRaises(ValueError, JobMgr, mock.Mock(), 'http://server', 'token', 'site-id',
+                          min_interval=5, max_interval=2)
+
+
+JOBS_URL = 'http://server/api/3.11/sites/site-id/jobs'
+
+
+def _response(status_code, body=''):
+    return mock.Mock(status_code=status_code, text='<tsResponse xmlns="http://tableau.com/api">' + body + '</tsResponse>')
+
+
+@mock.patch('democli.job.job_mgr.requests.get')
+class JobMgrQueryJobsTest(unittest.TestCase):
+    def setUp(self):
+        self.job_mgr = JobMgr(mock.Mock(), 'http://server', 'token', 'site-id')
+
+    def test_batched_with_per_job_fallback(self, get):
+        responses = {
+            JOBS_URL + '/job-b': _response(200, '<job id="job-b" progress="50"/>'),
+            JOBS_URL + '/job-c': _response(200, '<job id="job-c" completedAt="2020-01-01T00:00:00Z" finishCode="1"/>'),
+            JOBS_URL + '/job-d': _response(404),
+        }
+        listing = _response(200, '<pagination totalAvailable="2"/><backgroundJobs>'
+                                 '<backgroundJob id="job-a" status="Success"/>'
+                                 '<backgroundJob id="other" status="Failed"/></backgroundJobs>')
+        get.side_effect = lambda url, headers: responses.get(url, listing)
+        statuses = self.job_mgr.query_jobs(['job-a', 'job-b', 'job-c', 'job-d'], '2020-01-01T00:00:00Z')
+
+        self.assertEqual(statuses, {'job-a': 'Success', 'job-b': 'InProgress', 'job-c': 'Failed'})
+        urls = [call[0][0] for call in get.call_args_list]
+        self.assertIn('filter=createdAt:gte:2020-01-01T00%3A00%3A00Z', urls[0])
+        self.assertEqual(sorted(urls[1:]), sorted(responses))
+
+    def test_rejected_list_is_not_paged(self, get):
+        responses = {JOBS_URL + '/job-a': _response(200, '<job id="job-a" completedAt="2020-01-01T00:00:00Z" '
+                                                         'finishCode="0"/>')}
+        get.side_effect = lambda url, headers: responses.get(url, _response(400, '<error code="400000"/>'))
+
+        self.assertEqual(self.job_mgr.query_jobs(['job-a'], '2020-01-01T00:00:00Z'), {'job-a': 'Success'})
+        self.assertEqual(get.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import xml.etree.ElementTree as ET
+from democli.error_handlers.errors import ApiCallError, UserDefinedFieldError
+from democli.plan.plan_mgr import PlanMgr, Endpoint, Transfer, Session, SIZE_UNIT
+from democli.workbook.workbook_mgr import WorkbookMgr
+
+SOURCE = Endpoint('http://source', 'user', 'password', '')
+DEST = Endpoint('http://dest', 'user', 'password', '')
+OTHER = Endpoint('http://other', 'user', 'password', '')
+
+# Workbook sizes in MB as reported by the server
+SIZES = {'small': '0', 'medium': '3', 'large': '120'}
+
+
+def _sign_in(endpoint):
+    """Returns a Session whose workbook manager answers from SIZES."""
+    workbook_mgr = mock.Mock()
+    workbook_mgr.get_workbooks.side_effect = lambda user_id, names: dict(
+        (name, ET.Element('workbook', id='id-' + name, name=name, size=SIZES[name])) for name in names)
+    workbook_mgr.get_default_project_id.return_value = 'default-project'
+    return Session(mock.Mock(), 'token', 'user-id', workbook_mgr)
+
+
+@mock.patch.object(PlanMgr, '_sign_in', side_effect=_sign_in)
+class PlanMgrTest(unittest.TestCase):
+    def _plan(self, *names):
+        return PlanMgr(mock.Mock(), [Transfer(name, SOURCE, DEST) for name in names]).build()
+
+    def test_build(self, sign_in):
+        plan_mgr = self._plan('small', 'large', 'medium', 'small')
+
+        self.assertEqual(sign_in.call_count, 2)
+        self.assertEqual([step.transfer.workbook_name for step in plan_mgr.steps], ['large', 'medium', 'small'])
+        # Workbooks under 1MB are counted as 1MB
+        self.assertEqual([step.size for step in plan_mgr.steps], [120 * SIZE_UNIT, 3 * SIZE_UNIT, SIZE_UNIT])
+        plan_mgr.sessions[SOURCE].workbook_mgr.get_workbooks.assert_called_once_with(
+            'user-id', ['small', 'large', 'medium'])
+
+    def test_estimate(self, sign_in):
+        calls, transferred, unplanned_calls = self._plan('small', 'large').estimate()
+
+        # 2 sign-ins, 2 sign-outs, 2 lookups; small: 3 calls; large: download, 2 + 24 chunks, delete
+        self.assertEqual(calls, 6 + 3 + 28)
+        self.assertEqual(unplanned_calls, 12 + 3 + 28)
+        self.assertEqual(transferred, 2 * 121 * SIZE_UNIT)
+
+    def test_conflicting_destinations(self, sign_in):
+        transfers = [Transfer('small', SOURCE, DEST), Transfer('small', SOURCE, OTHER)]
+        self.assertRaises(UserDefinedFieldError, PlanMgr, mock.Mock(), transfers)
+
+    def test_same_site(self, sign_in):
+        same_site = Endpoint(SOURCE.server, 'admin', 'secret', SOURCE.site)
+        self.assertRaises(UserDefinedFieldError, PlanMgr, mock.Mock(), [Transfer('small', SOURCE, same_site)])
+
+    def test_execute_failure_removes_temp_file(self, sign_in):
+        plan_mgr = self._plan('large', 'small')
+        handle, filename = tempfile.mkstemp()
+        os.close(handle)
+        plan_mgr.sessions[SOURCE].workbook_mgr.download.return_value = filename
+        plan_mgr.sessions[DEST].workbook_mgr.publish_workbook.side_effect = ApiCallError('publish failed')
+
+        self.assertRaises(ApiCallError, plan_mgr.execute)
+        self.assertFalse(os.path.exists(filename))
+        plan_mgr.sessions[SOURCE].workbook_mgr.delete_workbook.assert_not_called()
+
+
+def _server(method, url, **kwargs):
+    """Answers the requests of a move from SOURCE to DEST like a Tableau server."""
+    xml = '<tsResponse xmlns="http://tableau.com/api">{0}</tsResponse>'
+    if method == 'get' and url.startswith('http://source/api/3.11/sites/source-site/users/user-id/workbooks?'):
+        return mock.Mock(status_code=200, text=xml.format(
+            '<pagination totalAvailable="1"/><workbooks><workbook id="wb-1" name="Sales" size="2">'
+            '<project id="src-project"/></workbook></workbooks>'))
+    if method == 'get' and url.startswith('http://dest/api/3.11/sites/dest-site/projects?'):
+        return mock.Mock(status_code=200, text=xml.format(
+            '<pagination totalAvailable="1"/><projects><project id="dest-project" name="default"/></projects>'))
+    if method == 'get' and url == 'http://source/api/3.11/sites/source-site/workbooks/wb-1/content':
+        return mock.Mock(status_code=200, content=b'workbook bytes',
+                         headers={'Content-Disposition': 'name="tableau_workbook"; filename="Sales.twbx"'})
+    if method == 'post' and url == 'http://dest/api/3.11/sites/dest-site/workbooks?workbookType=twbx&overwrite=true':
+        return mock.Mock(status_code=201, text=xml.format('<workbook id="wb-2"/>'))
+    if method == 'delete' and url == 'http://source/api/3.11/sites/source-site/workbooks/wb-1':
+        return mock.Mock(status_code=204, text='')
+    raise AssertionError('Unexpected request: {0} {1}'.format(method, url))
+
+
+class PlanMgrExecuteTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        os.rmdir(self.tmp)
+
+    def test_execute_with_workbook_mgr(self):
+        def sign_in(endpoint):
+            site_id = endpoint.server[len('http://'):] + '-site'
+            return Session(mock.Mock(), 'token', 'user-id', WorkbookMgr(mock.Mock(), endpoint.server, 'token', site_id))
+
+        with mock.patch.object(PlanMgr, '_sign_in', side_effect=sign_in), \
+                mock.patch('requests.get', side_effect=lambda url, **kwargs: _server('get', url, **kwargs)), \
+                mock.patch('requests.post', side_effect=lambda url, **kwargs: _server('post', url, **kwargs)), \
+                mock.patch('requests.delete', side_effect=lambda url, **kwargs: _server('delete', url, **kwargs)) \
+                as delete:
+            PlanMgr(mock.Mock(), [Transfer('Sales', SOURCE, DEST)]).build().execute()
+
+        delete.assert_called_once_with('http://source/api/3.11/sites/source-site/workbooks/wb-1',
+                                       headers={'x-tableau-auth': 'token'})
+        # The downloaded temp file is removed
+        self.assertEqual(os.listdir(self.tmp), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import json
+import tempfile
+import unittest
+from democli.utils.profile_util import Profiler
+
+
+def _allocate():
+    return [json.dumps({'value': i}) for i in range(10000)]
+
+
+class ProfilerTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.output = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.output)
+
+    def test_report(self):
+        profiler = Profiler(self.output)
+        profiler.start()
+        profiler.phase('first')
+        data = _allocate()
+        profiler.phase('second')
+        data.extend(_allocate())
+        profiler.stop()
+
+        with open(self.output) as f:
+            report = f.read()
+
+        for name in ('setup', 'first', 'second'):
+            section = report.split("=== Phase '{0}' ===".format(name))[1].split('=== Phase')[0]
+            self.assertIn('Duration: ', section)
+            self.assertIn('Peak above phase start: ', section)
+            self.assertIn('allocation sites:', section)
+            self.assertIn('functions by cumulative time:', section)
+        # The allocations of the profiled code are reported
+        self.assertIn('test_profile_util.py', report.split("=== Phase 'first' ===")[1])
+        # The profiler's own allocations and calls are not
+        self.assertNotIn('profile_util.py:', report.replace('test_profile_util.py:', ''))
+        self.assertNotIn('profile_util.py(', report.replace('test_profile_util.py(', ''))
+
+
+if __name__ == '__main__':
+    unittest.main()
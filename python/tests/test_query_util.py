@@ -0,0 +1,127 @@
+import unittest
+from unittest import mock
+import xml.etree.ElementTree as ET
+from democli.utils.query_util import QueryBuilder
+
+URL = 'http://server/api/3.11/sites/site-id/projects'
+
+
+def _response(status_code, projects=(), total=None):
+    """Returns a fake server response listing the given (id, name) projects."""
+    body = '<tsResponse xmlns="http://tableau.com/api">'
+    body += '<pagination totalAvailable="{0}"/><projects>'.format(len(projects) if total is None else total)
+    body += ''.join('<project id="{0}" name="{1}"/>'.format(i, n) for i, n in projects)
+    body += '</projects></tsResponse>'
+    return mock.Mock(status_code=status_code, text=body)
+
+
+class QueryBuilderTest(unittest.TestCase):
+    def test_build_server_side(self):
+        query = QueryBuilder(URL).filter('name', 'eq', 'Sales').fields('id', 'project.id').sort('name', 'desc')
+        self.assertEqual(query.build(), URL + '?pageSize=100&pageNumber=1&filter=name:eq:Sales'
+                                              '&fields=id,project.id&sort=name:desc')
+
+    def test_build_escapes_values(self):
+        query = QueryBuilder(URL).filter('name', 'in', ['Q1 #2 A+B', '50%'])
+        self.assertEqual(query.build(), URL + '?pageSize=100&pageNumber=1&filter=name:in:[Q1%20%232%20A%2BB,50%25]')
+
+    def test_build_client_side(self):
+        query = QueryBuilder(URL).filter('name', 'eq', 'Sales').fields('id')
+        self.assertEqual(query.build(3, server_side=False), URL + '?pageSize=100&pageNumber=3')
+
+    def test_server_side(self):
+        self.assertTrue(QueryBuilder(URL).filter('name', 'eq', 'Q1 #2 A+B').server_side())
+        self.assertFalse(QueryBuilder(URL).filter('name', 'eq', 'a,b').server_side())
+        self.assertFalse(QueryBuilder(URL).filter('name', 'in', ['ok', 'x:y']).server_side())
+
+    def test_matches(self):
+        query = QueryBuilder(URL).filter('name', 'in', ['default', 'Default'])
+        self.assertTrue(query.matches(ET.Element('project', name='Default')))
+        self.assertFalse(query.matches(ET.Element('project', name='Sales')))
+        self.assertFalse(query.matches(ET.Element('project')))
+
+    def test_matches_numbers(self):
+        small, large = ET.Element('workbook', size='9'), ET.Element('workbook', size='10')
+        for value in ('10', 10):
+            query = QueryBuilder(URL).filter('size', 'gt', value)
+            self.assertFalse(query.matches(small))
+            self.assertFalse(query.matches(large))
+        self.assertTrue(QueryBuilder(URL).filter('size', 'gte', 10).matches(large))
+        self.assertTrue(QueryBuilder(URL).filter('size', 'lt', '10').matches(small))
+
+    def test_matches_dates_as_text(self):
+        query = QueryBuilder(URL).filter('createdAt', 'gte', '2020-01-01T00:00:00Z')
+        self.assertTrue(query.matches(ET.Element('job', createdAt='2020-06-01T00:00:00Z')))
+        self.assertFalse(query.matches(ET.Element('job', createdAt='2019-06-01T00:00:00Z')))
+
+    def test_matches_trusts_server_for_non_attribute_fields(self):
+        query = QueryBuilder(URL).filter('ownerName', 'eq', 'alice').filter('name', 'eq', 'Sales')
+        self.assertTrue(query.matches(ET.Element('workbook', name='Sales'), server_side=True))
+        self.assertFalse(query.matches(ET.Element('workbook', name='Other'), server_side=True))
+        self.assertFalse(query.matches(ET.Element('workbook', name='Sales')))
+
+    @mock.patch('democli.utils.query_util.requests.get')
+    def test_fetch_server_side_non_attribute_field(self, get):
+        get.return_value = _response(200, [('p1', 'Sales')])
+        projects = QueryBuilder(URL).filter('ownerName', 'eq', 'alice').fetch('token', 'project')
+
+        self.assertEqual([p.get('id') for p in projects], ['p1'])
+
+    @mock.patch('democli.utils.query_util.requests.get')
+    def test_fetch_client_side_non_attribute_field(self, get):
+        get.side_effect = [_response(400), _response(200, [('p1', 'Sales')])]
+        query = QueryBuilder(URL).filter('ownerName', 'eq', 'alice')
+
+        self.assertRaises(ValueError, query.fetch, 'token', 'project')
+
+    @mock.patch('democli.utils.query_util.requests.get')
+    def test_fetch_server_side(self, get):
+        get.return_value = _response(200, [('p1', 'default')])
+        projects = QueryBuilder(URL).filter('name', 'eq', 'default').fetch('token', 'project')
+
+        self.assertEqual([p.get('id') for p in projects], ['p1'])
+        self.assertEqual(get.call_count, 1)
+
+    @mock.patch('democli.utils.query_util.requests.get')
+    def test_fetch_falls_back_on_400(self, get):
+        get.side_effect = [_response(400),
+                           _response(200, [('p1', 'Sales')], total=150),
+                           _response(200, [('p2', 'default')], total=150)]
+        projects = QueryBuilder(URL).filter('name', 'eq', 'default').fetch('token', 'project')
+
+        self.assertEqual([p.get('id') for p in projects], ['p2'])
+        urls = [call[0][0] for call in get.call_args_list]
+        self.assertIn('filter=', urls[0])
+        self.assertEqual(urls[1:], [URL + '?pageSize=100&pageNumber=1', URL + '?pageSize=100&pageNumber=2'])
+
+    @mock.patch('democli.utils.query_util.requests.get')
+    def test_fetch_client_side_for_reserved_chars(self, get):
+        get.return_value = _response(200, [('p1', 'a,b'), ('p2', 'a')])
+        projects = QueryBuilder(URL).filter('name', 'eq', 'a,b').fetch('token', 'project')
+
+        self.assertEqual([p.get('id') for p in projects], ['p1'])
+        self.assertNotIn('filter=', get.call_args[0][0])
+
+
+    @mock.patch('democli.utils.query_util.requests.get')
+    def test_fetch_by_name(self, get):
+        get.return_value = _response(200, [('p1', 'Sales'), ('p2', 'Finance')])
+        projects = QueryBuilder(URL).fetch_by_name('token', 'project', ['Sales', 'Finance'])
+
+        self.assertEqual(dict((name, p.get('id')) for name, p in projects.items()), {'Sales': 'p1', 'Finance': 'p2'})
+        self.assertIn('filter=name:in:[Sales,Finance]', get.call_args[0][0])
+
+    @mock.patch('democli.utils.query_util.requests.get')
+    def test_fetch_by_name_duplicate_or_missing(self, get):
+        get.return_value = _response(200, [('p1', 'Sales'), ('p2', 'Sales')])
+        self.assertRaises(LookupError, QueryBuilder(URL).fetch_by_name, 'token', 'project', ['Sales'])
+
+        get.return_value = _response(200, [('p1', 'Sales')])
+        self.assertRaises(LookupError, QueryBuilder(URL).fetch_by_name, 'token', 'project', ['Sales', 'Finance'])
+
+    def test_server_side_dates(self):
+        self.assertTrue(QueryBuilder(URL).filter('createdAt', 'gte', '2020-01-01T00:00:00Z').server_side())
+        self.assertFalse(QueryBuilder(URL).filter('name', 'eq', '2020-01-01T00:00:00Z').server_side())
+
+if __name__ == '__main__':
+    unittest.main()